@@ -20,6 +20,7 @@ class Database:
     def __init__(self):
         self.supabase: Optional[Client] = None
         self.pg_connection = None
+        self._pg_params: Optional[Dict[str, Any]] = None
         self._initialized = False
     
     def init_app(self, app):
@@ -69,14 +70,14 @@ class Database:
                 pg_user = os.environ.get('POSTGRES_USER', 'postgres')
                 pg_password = os.environ.get('POSTGRES_PASSWORD', 'postgres')
             
-            self.pg_connection = psycopg2.connect(
-                host=pg_host,
-                port=pg_port,
-                database=pg_db,
-                user=pg_user,
-                password=pg_password,
-                cursor_factory=RealDictCursor
-            )
+            self._pg_params = {
+                'host': pg_host,
+                'port': pg_port,
+                'database': pg_db,
+                'user': pg_user,
+                'password': pg_password
+            }
+            self.pg_connection = self.connect_pg()
             
             logger.info(f"PostgreSQL direct connection established to {pg_host}:{pg_port}/{pg_db}")
             
@@ -84,6 +85,16 @@ class Database:
             logger.warning(f"Could not establish direct PostgreSQL connection: {str(e)}")
             self.pg_connection = None
     
+    def connect_pg(self):
+        """Abrir una conexión PostgreSQL nueva con los mismos parámetros que la compartida.
+        
+        Una conexión de psycopg2 no admite transacciones desde varios hilos: los hilos en
+        segundo plano deben usar la suya propia.
+        """
+        if not self._pg_params:
+            raise RuntimeError("PostgreSQL connection not configured")
+        return psycopg2.connect(cursor_factory=RealDictCursor, **self._pg_params)
+    
     def execute_query(self, query: str, params: tuple = None) -> List[Dict[str, Any]]:
         """Ejecutar una consulta SQL directa"""
         if not self.pg_connection:
@@ -116,6 +127,26 @@ class Database:
             logger.error(f"Transaction failed: {str(e)}")
             raise
     
+    def execute_many(self, query: str, params_list: List[tuple], connection=None) -> bool:
+        """Ejecutar una misma consulta con múltiples conjuntos de parámetros.
+        
+        Por defecto usa la conexión compartida; un hilo en segundo plano pasa la suya.
+        """
+        connection = connection or self.pg_connection
+        if not connection:
+            raise RuntimeError("PostgreSQL connection not available")
+        
+        try:
+            with connection.cursor() as cursor:
+                cursor.executemany(query, params_list)
+                connection.commit()
+                return True
+        except Exception as e:
+            if not connection.closed:
+                connection.rollback()
+            logger.error(f"Batch execution failed: {str(e)}")
+            raise
+    
     def get_client(self) -> Client:
         """Obtener el cliente de Supabase"""
         if not self._initialized or not self.supabase:
@@ -7,8 +7,12 @@ import logging
 import json
 import subprocess
 import requests
+import http.cookiejar
 import importlib
 import sys
+import queue
+import threading
+import atexit
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 import uuid
@@ -18,6 +22,15 @@ from src.models.database import db, ToolModel
 
 logger = logging.getLogger(__name__)
 
+# Tamaño máximo de la cola de registros de ejecución y filas por lote
+EXECUTION_LOG_QUEUE_SIZE = 10_000
+EXECUTION_LOG_BATCH_SIZE = 128
+# Segundos que se espera al cerrar el proceso para vaciar la cola de registros
+EXECUTION_LOG_DRAIN_TIMEOUT = 10
+
+# Marca de fin para el hilo de registros
+_LOG_STOP = object()
+
 class ToolExecutionModel:
     """Modelo para ejecuciones de herramientas"""
     
@@ -47,6 +60,46 @@ class ToolExecutionModel:
             logger.error(f"Create execution failed: {str(e)}")
             raise
     
+    def create_executions(self, executions: List[Dict[str, Any]], connection=None) -> bool:
+        """Insertar o actualizar en bloque registros de ejecución (en curso o finalizados)"""
+        try:
+            params_list = []
+            for execution_data in executions:
+                result = execution_data.get('result')
+                if isinstance(result, (dict, list)):
+                    result = json.dumps(result)
+                
+                params_list.append((
+                    execution_data['id'],
+                    execution_data.get('task_id'),
+                    execution_data['tool_id'],
+                    json.dumps(execution_data['parameters']),
+                    execution_data.get('status', 'pending'),
+                    result,
+                    execution_data.get('error_message'),
+                    execution_data['started_at'],
+                    execution_data.get('completed_at'),
+                    execution_data.get('execution_time_ms')
+                ))
+            
+            return db.execute_many("""
+                INSERT INTO tool_executions (
+                    id, task_id, tool_id, parameters, status, result,
+                    error_message, started_at, completed_at, execution_time_ms
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (id) DO UPDATE SET
+                    status = EXCLUDED.status,
+                    result = EXCLUDED.result,
+                    error_message = EXCLUDED.error_message,
+                    completed_at = EXCLUDED.completed_at,
+                    execution_time_ms = EXCLUDED.execution_time_ms
+                WHERE tool_executions.completed_at IS NULL
+            """, params_list, connection)
+            
+        except Exception as e:
+            logger.error(f"Create executions failed: {str(e)}")
+            raise
+    
     def update_execution(self, execution_id: str, update_data: Dict[str, Any]) -> Dict[str, Any]:
         """Actualizar ejecución"""
         try:
@@ -79,6 +132,121 @@ class ToolExecutionModel:
             logger.error(f"Update execution failed: {str(e)}")
             raise
 
+class ExecutionLogWriter:
+    """Escritura en segundo plano y por lotes de los registros de ejecución.
+    
+    Hay una sola instancia por proceso (_execution_log): las rutas crean un ToolService
+    por petición, y cada uno no debe arrancar su propio hilo ni abrir su propia conexión.
+    """
+    
+    def __init__(self):
+        self.execution_model = ToolExecutionModel()
+        self._queue = queue.Queue(maxsize=EXECUTION_LOG_QUEUE_SIZE)
+        # El hilo se arranca con el primer registro (el modo de prueba no escribe ninguno)
+        self._thread = None
+        self._thread_lock = threading.Lock()
+    
+    def record(self, execution_data: Dict[str, Any]):
+        """Encolar una copia del registro de ejecución; si la cola está llena, escribir de forma síncrona"""
+        if self._thread is None:
+            self._start()
+        
+        execution_data = dict(execution_data)
+        try:
+            self._queue.put_nowait(execution_data)
+        except queue.Full:
+            try:
+                self.execution_model.create_executions([execution_data])
+            except Exception as e:
+                logger.error(f"Synchronous execution log failed: {str(e)}")
+    
+    def _start(self):
+        """Arrancar el hilo de registros y vaciar su cola al cerrar el proceso"""
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._worker,
+                    name='tool-execution-log',
+                    daemon=True
+                )
+                self._thread.start()
+                atexit.register(self._stop)
+    
+    def _stop(self):
+        """Escribir los registros pendientes y detener el hilo"""
+        try:
+            self._queue.put(_LOG_STOP, timeout=EXECUTION_LOG_DRAIN_TIMEOUT)
+        except queue.Full:
+            logger.error(f"Execution log queue still full at shutdown; {self._queue.qsize()} records lost")
+            return
+        self._thread.join(EXECUTION_LOG_DRAIN_TIMEOUT)
+        if self._thread.is_alive():
+            logger.error(f"Execution log drain timed out; {self._queue.qsize()} records lost")
+    
+    def _worker(self):
+        """Vaciar la cola de registros de ejecución insertando por lotes hasta la marca de fin"""
+        # Conexión propia: la compartida la usan a la vez los hilos de las peticiones
+        connection = None
+        stopping = False
+        
+        try:
+            while not stopping:
+                batch = []
+                item = self._queue.get()
+                while True:
+                    if item is _LOG_STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                    if len(batch) >= EXECUTION_LOG_BATCH_SIZE:
+                        break
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                
+                if batch:
+                    connection = self._write_batch(batch, connection)
+        finally:
+            if connection is not None and not connection.closed:
+                connection.close()
+    
+    def _write_batch(self, batch: List[Dict[str, Any]], connection):
+        """Escribir un lote; si falla, reintentar fila a fila para no perder el resto. Devuelve la conexión"""
+        try:
+            if connection is None or connection.closed:
+                connection = db.connect_pg()
+            self.execution_model.create_executions(batch, connection)
+            return connection
+        except Exception as e:
+            logger.warning(f"Execution log batch of {len(batch)} failed, retrying row by row: {str(e)}")
+        
+        for execution_data in batch:
+            try:
+                if connection is None or connection.closed:
+                    connection = db.connect_pg()
+                self.execution_model.create_executions([execution_data], connection)
+            except Exception as e:
+                logger.error(f"Execution log {execution_data['id']} dropped: {str(e)}")
+        return connection
+
+# Instancia única de escritura de registros de ejecución
+_execution_log = ExecutionLogWriter()
+
+# Sesiones HTTP por hilo, a nivel de módulo: ToolService se crea por petición y una sesión
+# por instancia nunca llegaría a reutilizar sus conexiones
+_http_local = threading.local()
+
+def _http_session() -> requests.Session:
+    """Sesión HTTP del hilo actual (keep-alive): requests.Session no es segura entre hilos"""
+    session = getattr(_http_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        # Sin persistencia de cookies: las llamadas de distintas tareas no comparten estado
+        session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+        _http_local.session = session
+    return session
+
 class ToolService:
     """Servicio para gestión y ejecución de herramientas"""
     
@@ -149,6 +317,7 @@ class ToolService:
         """Ejecutar una herramienta"""
         execution_id = str(uuid.uuid4())
         start_time = datetime.utcnow()
+        execution_data = None
         
         try:
             # Obtener información de la herramienta
@@ -168,25 +337,26 @@ class ToolService:
                     'execution_id': execution_id
                 }
             
-            # Crear registro de ejecución
+            # Preparar registro de ejecución (se escribe en segundo plano al empezar y al finalizar)
             if not test_mode:
                 execution_data = {
                     'id': execution_id,
                     'task_id': task_id,
                     'tool_id': tool['id'],
-                    'parameters': parameters
+                    'parameters': parameters,
+                    'started_at': start_time.isoformat()
                 }
-                self.execution_model.create_execution(execution_data)
             
             # Validar parámetros
             validation_result = self._validate_parameters(tool, parameters)
             if not validation_result['valid']:
-                if not test_mode:
-                    self.execution_model.update_execution(execution_id, {
+                if execution_data:
+                    execution_data.update({
                         'status': 'failed',
                         'error_message': validation_result['error'],
                         'completed_at': datetime.utcnow().isoformat()
                     })
+                    _execution_log.record(execution_data)
                 
                 return {
                     'success': False,
@@ -194,11 +364,9 @@ class ToolService:
                     'execution_id': execution_id
                 }
             
-            # Actualizar estado a ejecutándose
-            if not test_mode:
-                self.execution_model.update_execution(execution_id, {
-                    'status': 'running'
-                })
+            # Registrar la ejecución en curso; el registro final la actualiza por id
+            if execution_data:
+                _execution_log.record(dict(execution_data, status='running'))
             
             # Ejecutar herramienta según su tipo
             implementation_type = tool.get('implementation_type', 'python')
@@ -221,16 +389,17 @@ class ToolService:
             end_time = datetime.utcnow()
             execution_time = (end_time - start_time).total_seconds() * 1000  # en milisegundos
             
-            # Actualizar registro de ejecución
-            if not test_mode:
-                update_data = {
+            # Encolar registro de ejecución
+            if execution_data:
+                execution_data.update({
                     'status': 'completed' if result['success'] else 'failed',
                     'result': result.get('result'),
                     'error_message': result.get('error') if not result['success'] else None,
                     'completed_at': end_time.isoformat(),
                     'execution_time_ms': execution_time
-                }
-                self.execution_model.update_execution(execution_id, update_data)
+                })
+                _execution_log.record(execution_data)
+                execution_data = None
             
             # Incrementar contador de uso
             if not test_mode and result['success']:
@@ -248,20 +417,18 @@ class ToolService:
         except Exception as e:
             logger.error(f"Tool execution failed: {str(e)}")
             
-            # Actualizar registro con error
-            if not test_mode:
-                try:
-                    end_time = datetime.utcnow()
-                    execution_time = (end_time - start_time).total_seconds() * 1000
-                    
-                    self.execution_model.update_execution(execution_id, {
-                        'status': 'failed',
-                        'error_message': str(e),
-                        'completed_at': end_time.isoformat(),
-                        'execution_time_ms': execution_time
-                    })
-                except:
-                    pass
+            # Encolar registro con error
+            if execution_data:
+                end_time = datetime.utcnow()
+                execution_time = (end_time - start_time).total_seconds() * 1000
+                
+                execution_data.update({
+                    'status': 'failed',
+                    'error_message': str(e),
+                    'completed_at': end_time.isoformat(),
+                    'execution_time_ms': execution_time
+                })
+                _execution_log.record(execution_data)
             
             return {
                 'success': False,
@@ -464,15 +631,15 @@ class ToolService:
             
             # Realizar solicitud
             if method == 'GET':
-                response = requests.get(url, headers=headers, timeout=30)
+                response = _http_session().get(url, headers=headers, timeout=30)
             elif method == 'POST':
                 data = parameters.get('data', {})
-                response = requests.post(url, headers=headers, json=data, timeout=30)
+                response = _http_session().post(url, headers=headers, json=data, timeout=30)
             elif method == 'PUT':
                 data = parameters.get('data', {})
-                response = requests.put(url, headers=headers, json=data, timeout=30)
+                response = _http_session().put(url, headers=headers, json=data, timeout=30)
             elif method == 'DELETE':
-                response = requests.delete(url, headers=headers, timeout=30)
+                response = _http_session().delete(url, headers=headers, timeout=30)
             else:
                 return {
                     'success': False,
@@ -551,7 +718,7 @@ class ToolService:
         headers = parameters.get('headers', {})
         data = parameters.get('data', {})
         
-        response = requests.request(
+        response = _http_session().request(
             method=method,
             url=url,
             headers=headers,
@@ -87,23 +87,23 @@ def run_command(command_list, timeout=60, check=True, suppress_output=False, sup
             cmd_to_run, # Usar la lista procesada
             capture_output=True,
             text=True,
-            check=check,
+            check=False, # Se compara returncode: evita construir y capturar CalledProcessError
             timeout=timeout,
             encoding='utf-8',
             errors='replace'
         )
+        if check and process.returncode != 0:
+            if not suppress_output:
+                print_error(f"Error al ejecutar: {' '.join(command_list)}")
+                if process.stdout and process.stdout.strip(): print_info(f"Salida (stdout) del error: {process.stdout.strip()}")
+                if process.stderr and process.stderr.strip(): print_error(f"Salida (stderr) del error: {process.stderr.strip()}")
+            return False, process.stdout.strip() if process.stdout else "", process.stderr.strip() if process.stderr else ""
         if not suppress_output:
             if process.stdout and process.stdout.strip():
                 print_info(f"Salida de {' '.join(command_list)}:\n{process.stdout.strip()}")
             if process.stderr and process.stderr.strip():
                 print_warning(f"Salida de error (puede ser informativa) de {' '.join(command_list)}:\n{process.stderr.strip()}")
         return True, process.stdout.strip(), process.stderr.strip()
-    except subprocess.CalledProcessError as e:
-        if not suppress_output:
-            print_error(f"Error al ejecutar: {' '.join(command_list)}")
-            if e.stdout and e.stdout.strip(): print_info(f"Salida (stdout) del error: {e.stdout.strip()}")
-            if e.stderr and e.stderr.strip(): print_error(f"Salida (stderr) del error: {e.stderr.strip()}")
-        return False, e.stdout.strip() if e.stdout else "", e.stderr.strip() if e.stderr else ""
     except FileNotFoundError:
         if not suppress_output:
             print_error(f"Comando no encontrado: {command_list[0]}. Asegúrate de que esté instalado y en el PATH.")
@@ -184,31 +184,31 @@ def check_supabase_cli(): # Modificado para devolver ruta, SUPABASE_IN_PATH o Fa
             # No más preguntas aquí, procedemos si attempt_auto_install fue 's'
             # El siguiente bloque se ejecuta si scoop no está disponible y el usuario aceptó la instalación automática general.
             print_info("Intentando instalar Scoop...")
-            ps_command_policy = "Set-ExecutionPolicy RemoteSigned -Scope CurrentUser -Force"
-            ps_command_install = "iex (new-object net.webclient).downloadstring('https://get.scoop.sh')"
+            # Política de ejecución e instalador de Scoop en una sola sesión de PowerShell (un único arranque en frío);
+            # -NonInteractive hace que cualquier pregunta falle al momento en lugar de agotar el timeout
+            ps_command = (
+                "$ErrorActionPreference = 'Stop'; "
+                "Set-ExecutionPolicy RemoteSigned -Scope CurrentUser -Force; "
+                "iex (new-object net.webclient).downloadstring('https://get.scoop.sh')"
+            )
 
             print_warning("Cambiando política de ejecución de PowerShell para CurrentUser a RemoteSigned...")
-            policy_success, _, policy_err = run_command(["powershell", "-Command", ps_command_policy], timeout=60, check=False)
-            if not policy_success:
-                print_error(f"No se pudo cambiar la política de ejecución de PowerShell. Detalle: {policy_err}")
+            print_info("Descargando y ejecutando script de instalación de Scoop...")
+            install_scoop_success, _, scoop_install_err = run_command(["powershell", "-NoProfile", "-NonInteractive", "-Command", ps_command], timeout=300, check=False)
+            if install_scoop_success:
+                print_success("Script de instalación de Scoop ejecutado. Verificando Scoop...")
+                scoop_available, _, _ = run_command(["scoop", "--version"], suppress_output=True)
+                if scoop_available:
+                    print_success("¡Scoop instalado exitosamente!")
+                else:
+                    print_error(f"Scoop no se pudo verificar después de la instalación. Error: {scoop_install_err}")
             else:
-                print_success("Política de ejecución de PowerShell actualizada para CurrentUser.")
-                print_info("Descargando y ejecutando script de instalación de Scoop...")
-                install_scoop_success, _, scoop_install_err = run_command(["powershell", "-Command", ps_command_install], timeout=300, check=False)
-                if install_scoop_success:
-                    print_success("Script de instalación de Scoop ejecutado. Verificando Scoop...")
-                    scoop_available, _, _ = run_command(["scoop", "--version"], suppress_output=True)
-                    if scoop_available:
-                        print_success("¡Scoop instalado exitosamente!")
-                    else:
-                        print_error(f"Scoop no se pudo verificar después de la instalación. Error: {scoop_install_err}")
+                scoop_install_err_lower = scoop_install_err.lower()
+                if "running the installer as administrator is disabled" in scoop_install_err_lower or "abort." in scoop_install_err_lower:
+                    print_error("La instalación de Scoop falló porque requiere privilegios de administrador.")
+                    print_warning("Por favor, re-ejecuta este script (supabase_setup.py) como Administrador.")
                 else:
-                    scoop_install_err_lower = scoop_install_err.lower()
-                    if "running the installer as administrator is disabled" in scoop_install_err_lower or "abort." in scoop_install_err_lower:
-                        print_error("La instalación de Scoop falló porque requiere privilegios de administrador.")
-                        print_warning("Por favor, re-ejecuta este script (supabase_setup.py) como Administrador.")
-                    else:
-                        print_error(f"Falló la ejecución del script de instalación de Scoop. Error: {scoop_install_err}")
+                    print_error(f"Falló la ejecución del script de instalación de Scoop. Error: {scoop_install_err}")
 
         if scoop_available: # Si estaba disponible o se instaló y verificó
             print_info("Intentando instalar 'supabase' con Scoop...")
@@ -254,6 +254,7 @@ def check_supabase_cli(): # Modificado para devolver ruta, SUPABASE_IN_PATH o Fa
         print_info("Obteniendo información de la última release de Supabase CLI...")
         api_url = "https://api.github.com/repos/supabase/cli/releases/latest"
         release_data = {} # Inicializar en caso de error de red/API
+        temp_dir = None # Se asigna al empezar la descarga; lo consultan los bloques de limpieza
         try:
             with urllib.request.urlopen(api_url, timeout=10) as response:
                 release_data = json.loads(response.read().decode())
@@ -330,7 +331,15 @@ def check_supabase_cli(): # Modificado para devolver ruta, SUPABASE_IN_PATH o Fa
                     download_path = os.path.join(temp_dir, found_asset_name)
 
                     try:
-                        urllib.request.urlretrieve(download_url, download_path)
+                        # Descarga en streaming por bloques de 1 MiB (urlretrieve usa bloques de 8 KiB)
+                        with urllib.request.urlopen(download_url, timeout=30) as response, \
+                                open(download_path, 'wb') as download_file:
+                            total_size = int(response.headers.get('Content-Length', 0))
+                            if total_size:
+                                print_info(f"Tamaño de la descarga: {total_size / (1024 * 1024):.1f} MB")
+                            shutil.copyfileobj(response, download_file, 1024 * 1024)
+                            if total_size and download_file.tell() != total_size:
+                                raise IOError(f"Descarga incompleta: {download_file.tell()} de {total_size} bytes")
                         print_success(f"Descargado en: {download_path}")
 
                         print_info("Extrayendo binario...")
@@ -399,7 +408,7 @@ def check_supabase_cli(): # Modificado para devolver ruta, SUPABASE_IN_PATH o Fa
                          print_error(f"Error durante la descarga o extracción del asset: {e}")
                          return False # Fallo explícito
                     finally:
-                        if 'temp_dir' in locals() and os.path.exists(temp_dir): shutil.rmtree(temp_dir)
+                        if os.path.isdir(temp_dir): shutil.rmtree(temp_dir)
                 # Si no hay download_url o falla antes de la descarga
                 if not download_url: # Asegurarse de que si no hay URL, también es un fallo de este método.
                     return False
@@ -407,7 +416,7 @@ def check_supabase_cli(): # Modificado para devolver ruta, SUPABASE_IN_PATH o Fa
 
     except Exception as e:
         print_error(f"Ocurrió un error general durante el proceso de descarga directa: {e}")
-        if 'temp_dir' in locals() and os.path.exists(temp_dir) and os.path.isdir(temp_dir):
+        if temp_dir and os.path.isdir(temp_dir):
             shutil.rmtree(temp_dir)
         return False # Fallo explícito
 
@@ -743,8 +752,11 @@ def create_migration_from_init_sql():
         print_error(f"El directorio de migraciones '{MIGRATIONS_DIR}' no existe. Asegúrate de que 'supabase init' se haya ejecutado correctamente.")
         return False
 
+    # Una sola marca de tiempo para la comprobación y el nombre del archivo (coherentes aunque cambie el día)
+    timestamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+
     # Check if an initial schema migration from today already exists
-    today_str = datetime.datetime.now().strftime('%Y%m%d')
+    today_str = timestamp[:8]
     suffix_to_check = "_initial_schema_from_script.sql"
     try:
         for existing_file in os.listdir(MIGRATIONS_DIR):
@@ -761,7 +773,6 @@ def create_migration_from_init_sql():
         print_warning(f"Error al verificar migraciones existentes: {e}. Se intentará crear una nueva.")
         # Fall through to creating the migration.
 
-    timestamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
     migration_file_name = f"{timestamp}{suffix_to_check}" # Use the defined suffix
     migration_file_path = os.path.join(MIGRATIONS_DIR, migration_file_name)
 